@@ -1,7 +1,30 @@
 # cluster_migrations.py
-from config import es_source, es_target, logger
+from concurrent.futures import ThreadPoolExecutor
+from config import es_source, es_target, POOL_MAXSIZE, WRITE_TIMEOUT, retry_read, logger
 from elasticsearch import exceptions
 
+# Shared by every migrator, so concurrent PUTs (even from migrators running
+# side by side) never outnumber the client's pooled connections.
+_put_executor = ThreadPoolExecutor(max_workers=POOL_MAXSIZE)
+
+def parallel_put(items, put_fn, kind, name_of=lambda item: item[0]):
+    """
+    Apply put_fn to every item concurrently on the shared PUT executor.
+
+    Every put runs to completion, and each one that fails is logged with its
+    name, so one bad item doesn't abort or hide the rest.
+
+    :param kind: What is being migrated, for log messages (e.g. "role").
+    :param name_of: Returns an item's name; defaults to item[0] for (name, body) pairs.
+    """
+    items = list(items)
+    futures = [_put_executor.submit(put_fn, item) for item in items]
+    for item, future in zip(items, futures):
+        try:
+            future.result()
+        except Exception as e:
+            logger.error("Error migrating %s '%s': %s", kind, name_of(item), e)
+
 def migrate_component_templates():
     """
     Migrate all component templates from the source cluster (es_source) to the target cluster (es_target).
@@ -11,14 +34,17 @@ def migrate_component_templates():
     2. For each, replicate it on the target with the same name and body.
     Migrate component templates from source to target.
     """
+    def put_template(tmpl):
+        name = tmpl["name"]
+        body = tmpl["component_template"]
+        # Recreate with same name and body on the target cluster
+        es_target.cluster.put_component_template(name=name, body=body, request_timeout=WRITE_TIMEOUT)
+        logger.info("📦 Migrated component template '%s'", name)
+
     try:
-        resp = es_source.cluster.get_component_template()
-        for tmpl in resp.get("component_templates", []):
-            name = tmpl["name"]
-            body = tmpl["component_template"]
-            # Recreate with same name and body on the target cluster
-            es_target.cluster.put_component_template(name=name, body=body)
-            logger.info("📦 Migrated component template '%s'", name)
+        resp = retry_read(es_source.cluster.get_component_template)
+        parallel_put(resp.get("component_templates", []), put_template, "component template",
+                     lambda tmpl: tmpl["name"])
     except Exception as e:
         logger.error("Error migrating component templates: %s", e)
 
@@ -30,13 +56,16 @@ def migrate_index_templates():
     2. For each, put it on the target cluster using the same name and body.
     3. These index templates may 'compose_of' the component templates migrated earlier.
     """
+    def put_template(tpl):
+        name = tpl["name"]
+        body = tpl["index_template"]
+        es_target.indices.put_index_template(name=name, body=body, request_timeout=WRITE_TIMEOUT)
+        logger.info("📦 Migrated index template '%s'", name)
+
     try:
-        resp = es_source.indices.get_index_template()
-        for tpl in resp.get("index_templates", []):
-            name = tpl["name"]
-            body = tpl["index_template"]
-            es_target.indices.put_index_template(name=name, body=body)
-            logger.info("📦 Migrated index template '%s'", name)
+        resp = retry_read(es_source.indices.get_index_template)
+        parallel_put(resp.get("index_templates", []), put_template, "index template",
+                     lambda tpl: tpl["name"])
     except Exception as e:
         logger.error("Error migrating index templates: %s", e)
 
@@ -44,11 +73,14 @@ def migrate_ingest_pipelines():
     """
     Migrate ingest pipelines from source to target.
     """
+    def put_pipeline(item):
+        pid, body = item
+        es_target.ingest.put_pipeline(id=pid, body=body, request_timeout=WRITE_TIMEOUT)
+        logger.info("🚰 Migrated ingest pipeline '%s'", pid)
+
     try:
-        pipelines = es_source.ingest.get_pipeline()
-        for pid, body in pipelines.items():
-            es_target.ingest.put_pipeline(id=pid, body=body)
-            logger.info("🚰 Migrated ingest pipeline '%s'", pid)
+        pipelines = retry_read(es_source.ingest.get_pipeline)
+        parallel_put(pipelines.items(), put_pipeline, "ingest pipeline")
     except Exception as e:
         logger.error("Error migrating ingest pipelines: %s", e)
 
@@ -56,12 +88,18 @@ def migrate_stored_scripts():
     """
     Migrate stored scripts from source to target.
     """
+    def put_script(item):
+        sid, body = item
+        es_target.cluster.put_stored_script(id=sid, body=body, request_timeout=WRITE_TIMEOUT)
+        logger.info("✒️  Migrated stored script '%s'", sid)
+
     try:
-        scripts = es_source.cluster.get_stored_script()
-        for lang, slist in scripts.items():
-            for sid, body in slist.items():
-                es_target.cluster.put_stored_script(id=sid, body=body)
-                logger.info("✒️  Migrated stored script '%s'", sid)
+        scripts = retry_read(es_source.cluster.get_stored_script)
+        parallel_put(
+            [(sid, body) for slist in scripts.values() for sid, body in slist.items()],
+            put_script,
+            "stored script"
+        )
     except Exception as e:
         logger.error("Error migrating stored scripts: %s", e)
 
@@ -69,12 +107,14 @@ def migrate_enrich_policies():
     """
     Migrate enrich policies from source to target.
     """
+    def put_policy(pol):
+        name = pol["name"]
+        es_target.enrich.put_policy(name=name, body=pol, request_timeout=WRITE_TIMEOUT)
+        logger.info("🌾 Migrated enrich policy '%s'", name)
+
     try:
-        policies = es_source.enrich.get_policy().get("policies", [])
-        for pol in policies:
-            name = pol["name"]
-            es_target.enrich.put_policy(name=name, body=pol)
-            logger.info("🌾 Migrated enrich policy '%s'", name)
+        policies = retry_read(es_source.enrich.get_policy).get("policies", [])
+        parallel_put(policies, put_policy, "enrich policy", lambda pol: pol["name"])
     except Exception as e:
         logger.error("Error migrating enrich policies: %s", e)
 
@@ -82,13 +122,16 @@ def migrate_transforms():
     """
     Migrate transforms from source to target.
     """
+    def put_transform(t):
+        tid = t["id"]
+        cfg = t["config"]
+        es_target.transform.put_transform(transform_id=tid, body=cfg, request_timeout=WRITE_TIMEOUT)
+        logger.info("🔄 Migrated transform '%s'", tid)
+
     try:
-        transforms = es_source.transform.get_transform()
-        for t in transforms.get("transforms", []):
-            tid = t["id"]
-            cfg = t["config"]
-            es_target.transform.put_transform(transform_id=tid, body=cfg)
-            logger.info("🔄 Migrated transform '%s'", tid)
+        transforms = retry_read(es_source.transform.get_transform)
+        parallel_put(transforms.get("transforms", []), put_transform, "transform",
+                     lambda t: t["id"])
     except Exception as e:
         logger.error("Error migrating transforms: %s", e)
 
@@ -96,13 +139,15 @@ def migrate_rollup_jobs():
     """
     Migrate rollup jobs from source to target.
     """
+    def put_job(job):
+        cfg = job["config"]
+        jid = cfg["id"]
+        es_target.rollup.put_job(id=jid, body=cfg, request_timeout=WRITE_TIMEOUT)
+        logger.info("📊 Migrated rollup job '%s'", jid)
+
     try:
-        jobs = es_source.rollup.get_jobs().get("jobs", [])
-        for job in jobs:
-            cfg = job["config"]
-            jid = cfg["id"]
-            es_target.rollup.put_job(id=jid, body=cfg)
-            logger.info("📊 Migrated rollup job '%s'", jid)
+        jobs = retry_read(es_source.rollup.get_jobs).get("jobs", [])
+        parallel_put(jobs, put_job, "rollup job", lambda job: job["config"]["id"])
     except Exception as e:
         logger.error("Error migrating rollup jobs: %s", e)
 
@@ -110,11 +155,14 @@ def migrate_watchers():
     """
     Migrate watchers from source to target.
     """
+    def put_watch(item):
+        wid, body = item
+        es_target.watcher.put_watch(id=wid, body=body["watch"], request_timeout=WRITE_TIMEOUT)
+        logger.info("🔔 Migrated watcher '%s'", wid)
+
     try:
-        watches = es_source.watcher.get_watch()
-        for wid, body in watches.items():
-            es_target.watcher.put_watch(id=wid, body=body["watch"])
-            logger.info("🔔 Migrated watcher '%s'", wid)
+        watches = retry_read(es_source.watcher.get_watch)
+        parallel_put(watches.items(), put_watch, "watcher")
     except Exception as e:
         logger.error("Error migrating watcher watches: %s", e)
 
@@ -122,11 +170,14 @@ def migrate_roles():
     """
     Migrate security roles from source to target.
     """
+    def put_role(item):
+        role, body = item
+        es_target.security.put_role(name=role, body=body, request_timeout=WRITE_TIMEOUT)
+        logger.info("🔐 Migrated role '%s'", role)
+
     try:
-        roles = es_source.security.get_role()
-        for role, body in roles.items():
-            es_target.security.put_role(name=role, body=body)
-            logger.info("🔐 Migrated role '%s'", role)
+        roles = retry_read(es_source.security.get_role)
+        parallel_put(roles.items(), put_role, "role")
     except Exception as e:
         logger.error("Error migrating roles: %s", e)
 
@@ -134,11 +185,14 @@ def migrate_users():
     """
     Migrate users from source to target.
     """
+    def put_user(item):
+        user, body = item
+        es_target.security.put_user(username=user, body=body, request_timeout=WRITE_TIMEOUT)
+        logger.info("👤 Migrated user '%s'", user)
+
     try:
-        users = es_source.security.get_user()
-        for user, body in users.items():
-            es_target.security.put_user(username=user, body=body)
-            logger.info("👤 Migrated user '%s'", user)
+        users = retry_read(es_source.security.get_user)
+        parallel_put(users.items(), put_user, "user")
     except Exception as e:
         logger.error("Error migrating users: %s", e)
 
@@ -146,10 +200,13 @@ def migrate_role_mappings():
     """
     Migrate role mappings from source to target.
     """
+    def put_role_mapping(item):
+        name, body = item
+        es_target.security.put_role_mapping(name=name, body=body, request_timeout=WRITE_TIMEOUT)
+        logger.info("🔗 Migrated role mapping '%s'", name)
+
     try:
-        mappings = es_source.security.get_role_mapping()
-        for name, body in mappings.items():
-            es_target.security.put_role_mapping(name=name, body=body)
-            logger.info("🔗 Migrated role mapping '%s'", name)
+        mappings = retry_read(es_source.security.get_role_mapping)
+        parallel_put(mappings.items(), put_role_mapping, "role mapping")
     except Exception as e:
         logger.error("Error migrating role mappings: %s", e)
@@ -1,6 +1,6 @@
 # config.py
 import logging
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, exceptions
 #dfsdf
 # === Configuration ===
 SOURCE_ES = "http://source-es-url:9200"
@@ -9,8 +9,16 @@ AUTH = {"user": "user", "pass": "pass"}
 #PREFIX = "migrated-"
 SLICE_COUNT = 4
 BATCH_SIZE = 1000
-REQUEST_TIMEOUT = 600
+REQUEST_TIMEOUT = 600  # Default for calls without a per-operation timeout
+LIST_TIMEOUT = 10  # cat/exists lookups: fail fast on a dead cluster
+WRITE_TIMEOUT = 60  # Per-resource PUTs during cluster-level migration
+SNAPSHOT_TIMEOUT = 3600  # Blocking snapshot create/restore
+RESTORE_WAIT_TIMEOUT = 48 * 3600  # Deadline for every restore batch to recover (size for TB-scale restores)
 THROTTLE_DOCS_PER_SEC = -1  # -1 = no throttle
+INDEX_CACHE_TTL = 30  # Seconds to reuse a cat.indices listing
+POOL_MAXSIZE = 64  # Max pooled keep-alive HTTP connections per node
+READ_RETRIES = 3  # Retries for idempotent reads after a connection error or timeout
+RESTORE_BATCH_COUNT = 4  # Size-ordered batches the snapshot restore is split into
 
 # === Logging Setup ===
 logging.basicConfig(
@@ -22,9 +30,32 @@ logger = logging.getLogger("es_migration")
 # === Elasticsearch Clients ===
 es_source = Elasticsearch(
     SOURCE_ES,
-    basic_auth=(AUTH["user"], AUTH["pass"])
+    basic_auth=(AUTH["user"], AUTH["pass"]),
+    maxsize=POOL_MAXSIZE,
+    http_compress=True,  # gzip request/response bodies
+    timeout=REQUEST_TIMEOUT,  # 7.x client-wide default (request_timeout is per call only)
+    sniff_on_start=False,
+    max_retries=0  # Never resend writes; idempotent reads go through retry_read
 )
 es_target = Elasticsearch(
     TARGET_ES,
-    basic_auth=(AUTH["user"], AUTH["pass"])
+    basic_auth=(AUTH["user"], AUTH["pass"]),
+    maxsize=POOL_MAXSIZE,
+    http_compress=True,  # gzip request/response bodies
+    timeout=REQUEST_TIMEOUT,  # 7.x client-wide default (request_timeout is per call only)
+    sniff_on_start=False,
+    max_retries=0  # Never resend writes; idempotent reads go through retry_read
 )
+
+def retry_read(call, *args, **kwargs):
+    """
+    Call an idempotent read API (e.g. es_source.cat.indices), retrying it up to
+    READ_RETRIES times on connection errors and timeouts. The clients themselves
+    don't retry, so a timed-out create or snapshot is never sent twice.
+    """
+    for attempt in range(READ_RETRIES):
+        try:
+            return call(*args, **kwargs)
+        except exceptions.ConnectionError as e:
+            logger.warning("Read failed (%s); retrying (%d/%d)", e, attempt + 1, READ_RETRIES)
+    return call(*args, **kwargs)
@@ -1,6 +1,7 @@
 # indices.py
 
 import fnmatch
+import functools
 import time
 import re
 from elasticsearch import exceptions
@@ -11,37 +12,127 @@ from config import (
     SLICE_COUNT,      # No longer used with snapshot restore
     BATCH_SIZE,       # No longer used with snapshot restore
     REQUEST_TIMEOUT,  # Timeout for long-running requests
+    SNAPSHOT_TIMEOUT, # Timeout for blocking snapshot/restore calls
+    RESTORE_WAIT_TIMEOUT,  # Deadline for all restore batches to come up
     THROTTLE_DOCS_PER_SEC,  # No longer used with snapshot restore
+    LIST_TIMEOUT,     # Timeout for cheap listing/exists lookups
+    INDEX_CACHE_TTL,  # Seconds to reuse a cat.indices listing
+    retry_read,       # Retry wrapper for idempotent reads
     logger            # Central logger
 )
-from alias_utils import migrate_alias_between_clusters  # Alias migration helper (if renaming is required)
+from alias_utils import (  # Alias migration helpers (if renaming is required)
+    chunk_index_names,
+    migrate_alias_between_clusters,
+    migrate_aliases_between_clusters
+)
 from validation_utils import compare_doc_counts, compare_mappings
 
 # ----------------------------
 # Index Listing and Discovery
 # ----------------------------
 
+# Cached cat.indices listings, keyed by id(client) -> (fetched_at, names)
+_index_cache = {}
+
+def _cat_index_names(source_client, index=None, state="open", match=None):
+    """
+    Return the non‑system index names reported by the Cat Indices API.
+    Only the index column is requested, as plain text with one name per line.
+
+    :param index: Optional index expression to filter on server-side.
+    :param state: Which indices wildcards expand to ("open", "closed" or "all").
+    :param match: Optional predicate (e.g. a compiled regex's search) applied in the same pass.
+    """
+    resp = retry_read(source_client.cat.indices,
+        index=index, h="index", format="text", expand_wildcards=state,
+        request_timeout=LIST_TIMEOUT
+    )
+    names = (line.strip() for line in str(resp).splitlines())
+    # Filter out blank lines and names starting with '.'
+    return [
+        name for name in names
+        if name and not name.startswith(".") and (match is None or match(name))
+    ]
+
+def _log_closed_indices(source_client, index=None):
+    """
+    Log the closed indices skipped by the listing helpers. Closed indices can't be
+    migrated until they are opened, so they are reported rather than returned.
+    """
+    try:
+        closed = _cat_index_names(source_client, index=index, state="closed")
+        if closed:
+            logger.info("Skipping closed indices: %s", closed)
+    except exceptions.ElasticsearchException as e:
+        logger.warning("Could not list closed indices: %s", e)
+
+def _fetch_all_indices(source_client):
+    """
+    Return a tuple of all open non‑system index names on the given cluster.
+    The Cat Indices response is cached per client for INDEX_CACHE_TTL seconds.
+    """
+    key = id(source_client)
+    now = time.monotonic()
+    cached = _index_cache.get(key)
+    if cached and now - cached[0] < INDEX_CACHE_TTL:
+        return cached[1]
+    names = tuple(_cat_index_names(source_client))
+    _log_closed_indices(source_client)
+    _index_cache[key] = (now, names)
+    return names
+
+# Regex metacharacters that end a literal prefix
+_REGEX_META = ".^$*+?{}[]()|\\"
+# Characters that can't appear in an index name (or would change a wildcard expression)
+_NON_INDEX_CHARS = ' ,"<>/#'
+
+def _literal_prefix(regex_pattern):
+    """
+    Return the literal prefix of an anchored regex (e.g. '^logs-.*' -> 'logs-'),
+    or None when the pattern can't be safely narrowed to a wildcard.
+    """
+    if not regex_pattern.startswith("^") or "|" in regex_pattern:
+        return None
+    prefix = []
+    for ch in regex_pattern[1:]:
+        if ch in _REGEX_META:
+            # A quantifier after the last literal makes it optional
+            if ch in "?*{" and prefix:
+                prefix.pop()
+            break
+        if ch in _NON_INDEX_CHARS:
+            return None
+        prefix.append(ch)
+    return "".join(prefix) or None
+
+@functools.lru_cache(maxsize=256)
+def _compile_regex(regex_pattern):
+    """Compile a user-supplied index regex once, however often it is listed."""
+    return re.compile(regex_pattern)
+
 def list_indices(source_client):
     """
-    Return all non‑system indices (open + closed) from the given source cluster.
+    Return all open non‑system indices from the given source cluster.
     Uses the Cat Indices API and filters out system indices starting with a dot.
     """
     try:
-        raw = source_client.cat.indices(format="json", expand_wildcards="all")
-        return [idx["index"] for idx in raw if not idx["index"].startswith(".")]
+        return list(_fetch_all_indices(source_client))
     except exceptions.ElasticsearchException as e:
         logger.error("Error listing indices: %s", e)
         return []
 
 def list_indices_by_regex(source_client, regex_pattern):
     """
-    Retrieve all non‑system indices matching the provided regex pattern.
+    Retrieve all open non‑system indices matching the provided regex pattern.
+    Anchored patterns with a literal prefix are pre-filtered server-side.
     """
     try:
-        raw = source_client.cat.indices(format="json", expand_wildcards="all")
-        indices = [idx["index"] for idx in raw if not idx["index"].startswith(".")]
-        compiled = re.compile(regex_pattern)
-        return [idx for idx in indices if compiled.search(idx)]
+        search = _compile_regex(regex_pattern).search
+        prefix = _literal_prefix(regex_pattern)
+        if prefix:
+            _log_closed_indices(source_client, index=f"{prefix}*")
+            return _cat_index_names(source_client, index=f"{prefix}*", match=search)
+        return [idx for idx in _fetch_all_indices(source_client) if search(idx)]
     except exceptions.ElasticsearchException as e:
         logger.error("Error listing indices by regex '%s': %s", regex_pattern, e)
         return []
@@ -49,11 +140,20 @@ def list_indices_by_regex(source_client, regex_pattern):
 def list_specific_index(source_client, index_name):
     """
     Retrieve a specific index by exact match.
+
+    Issues a single Get Settings request for just index.uuid and returns a list
+    containing index_name if it is a concrete index. Aliases and data streams
+    resolve to other (backing) index names, so they don't count as a match.
     """
+    # System indices and wildcard expressions never count as an exact match
+    if index_name.startswith(".") or any(c in index_name for c in "*,"):
+        return []
     try:
-        raw = source_client.cat.indices(format="json", expand_wildcards="all")
-        indices = [idx["index"] for idx in raw if not idx["index"].startswith(".")]
-        return [idx for idx in indices if idx == index_name]
+        resp = retry_read(source_client.indices.get_settings,
+            index=index_name, name="index.uuid", ignore_unavailable=True,
+            request_timeout=LIST_TIMEOUT
+        )
+        return [index_name] if index_name in resp else []
     except exceptions.ElasticsearchException as e:
         logger.error("Error listing specific index '%s': %s", index_name, e)
         return []
@@ -82,7 +182,7 @@ def trigger_snapshot(source_client, repo_name, snapshot_name, indices=None):
             snapshot=snapshot_name,
             body=body,
             wait_for_completion=True,
-            request_timeout=REQUEST_TIMEOUT
+            request_timeout=SNAPSHOT_TIMEOUT
         )
         logger.info("Snapshot '%s' created in repository '%s'", snapshot_name, repo_name)
         return resp
@@ -90,26 +190,55 @@ def trigger_snapshot(source_client, repo_name, snapshot_name, indices=None):
         logger.error("Error triggering snapshot '%s': %s", snapshot_name, e)
         return None
 
-def check_snapshot_status(source_client, repo_name, snapshot_name):
+def check_snapshot_status(source_client, repo_name="_all", snapshot_name="_all"):
     """
     Check the status of a snapshot from the source cluster.
+
+    When both a repository and a snapshot are named, the Snapshot Status API is
+    queried for that one snapshot. Otherwise (the default "_all"/"_all"), every
+    matching snapshot across repositories is fetched with a single Get Snapshot
+    request and returned as a dict keyed by (repository, snapshot).
     
-    :param repo_name: The repository name.
-    :param snapshot_name: The name of the snapshot.
+    :param repo_name: The repository name, or "_all".
+    :param snapshot_name: The name of the snapshot, or "_all".
     :return: The snapshot status details.
     """
     try:
-        status = source_client.snapshot.status(
-            repository=repo_name,
-            snapshot=snapshot_name
-        )
-        logger.info("Snapshot status for '%s': %s", snapshot_name, status)
+        if repo_name != "_all" and snapshot_name != "_all":
+            status = retry_read(source_client.snapshot.status,
+                repository=repo_name,
+                snapshot=snapshot_name
+            )
+            logger.info("Snapshot status for '%s': %s", snapshot_name, status)
+            return status
+
+        resp = retry_read(source_client.snapshot.get, repository=repo_name, snapshot=snapshot_name)
+        status = {
+            (snap.get("repository", repo_name), snap["snapshot"]): snap
+            for snap in resp.get("snapshots", [])
+        }
+        logger.info("Snapshot states: %s",
+                    {key: snap.get("state") for key, snap in status.items()})
         return status
     except exceptions.ElasticsearchException as e:
         logger.error("Error checking snapshot status for '%s': %s", snapshot_name, e)
         return None
 
-def restore_snapshot(target_client, repo_name, snapshot_name, indices_pattern="_all", rename_pattern=None, rename_replacement=None):
+def get_index_sizes(source_client):
+    """
+    Return a dict of index name -> primary + replica store size in bytes.
+    Used to order restores so the largest indices start first.
+    """
+    try:
+        raw = retry_read(source_client.cat.indices,
+            h="index,store.size", bytes="b", format="json", request_timeout=LIST_TIMEOUT
+        )
+        return {r["index"]: int(r["store.size"] or 0) for r in raw}
+    except exceptions.ElasticsearchException as e:
+        logger.error("Error fetching index sizes: %s", e)
+        return {}
+
+def restore_snapshot(target_client, repo_name, snapshot_name, indices_pattern="_all", rename_pattern=None, rename_replacement=None, wait_for_completion=True):
     """
     Restore a snapshot on the target cluster.
     
@@ -120,29 +249,133 @@ def restore_snapshot(target_client, repo_name, snapshot_name, indices_pattern="_
     :param indices_pattern: Which indices from the snapshot to restore (default: "_all").
     :param rename_pattern: Regex pattern to match index names for renaming during restore.
     :param rename_replacement: Replacement string if renaming is needed.
+    :param wait_for_completion: If False, return once the restore is accepted; use
+                                wait_for_restored_batches to track its progress.
     :return: Response from the snapshot restore API.
     """
     body = {
         "indices": indices_pattern,
+        # Cluster-wide state (templates, pipelines, ILM, ...) is migrated separately
+        "include_global_state": False,
+        "include_aliases": True,
+        "ignore_unavailable": True,
+        "partial": False,
     }
     if rename_pattern and rename_replacement:
         body["rename_pattern"] = rename_pattern
         body["rename_replacement"] = rename_replacement
     try:
-        # Like snapshot creation, you can choose wait_for_completion=True for synchronous restore
         resp = target_client.snapshot.restore(
             repository=repo_name,
             snapshot=snapshot_name,
             body=body,
-            wait_for_completion=True,
-            request_timeout=REQUEST_TIMEOUT
+            wait_for_completion=wait_for_completion,
+            request_timeout=SNAPSHOT_TIMEOUT
         )
-        logger.info("Snapshot '%s' restored on target cluster", snapshot_name)
+        if wait_for_completion:
+            logger.info("Snapshot '%s' restored on target cluster", snapshot_name)
+        else:
+            logger.info("Restore of '%s' from snapshot '%s' started on target cluster",
+                        indices_pattern, snapshot_name)
         return resp
     except exceptions.ElasticsearchException as e:
         logger.error("Error restoring snapshot '%s': %s", snapshot_name, e)
         return None
 
+def _existing_indices(target_client, names):
+    """Return the subset of names that exist as indices on the target cluster."""
+    existing = set()
+    for chunk in chunk_index_names(names):
+        resp = retry_read(target_client.indices.get_settings,
+            index=",".join(chunk), name="index.uuid", ignore_unavailable=True,
+            request_timeout=LIST_TIMEOUT
+        )
+        existing.update(resp)
+    return existing
+
+def _failed_restore_indices(target_client, names):
+    """
+    Return the subset of names with a primary shard whose allocation or
+    restore has failed (unassigned reason ALLOCATION_FAILED). Primaries that
+    are merely queued behind the node recovery limits are not reported.
+    """
+    failed = set()
+    for chunk in chunk_index_names(names):
+        shards = retry_read(target_client.cat.shards,
+            index=",".join(chunk), h="index,prirep,unassigned.reason", format="json",
+            request_timeout=LIST_TIMEOUT
+        )
+        failed.update(
+            shard["index"] for shard in shards
+            if shard["prirep"] == "p" and shard.get("unassigned.reason") == "ALLOCATION_FAILED"
+        )
+    return failed
+
+def wait_for_restored_batches(target_client, batches, timeout=RESTORE_WAIT_TIMEOUT):
+    """
+    Yield each restore batch as soon as all of its indices have recovered their
+    primaries (health yellow or green), so it can be validated while larger
+    batches are still restoring.
+
+    Health is read per batch, in URL-sized chunks of index names, backing off
+    from 0.5 s up to 30 s between polls. A batch is given up on (and logged) if
+    one of its indices was not restored, or if a primary shard of a red index
+    failed to allocate or restore. Red indices whose primaries are still queued
+    keep waiting; batches still pending after timeout seconds are given up on.
+
+    :param batches: List of dicts mapping original index name -> restored index name.
+    :param timeout: Overall deadline in seconds for the whole restore.
+    """
+    try:
+        existing = _existing_indices(
+            target_client, [restored for batch in batches for restored in batch.values()]
+        )
+    except exceptions.ElasticsearchException as e:
+        logger.error("Error checking restored indices: %s", e)
+        return
+    pending = []
+    for batch in batches:
+        missing = [restored for restored in batch.values() if restored not in existing]
+        if missing:
+            logger.error("❌ Indices %s were not restored; skipping batch %s", missing, list(batch))
+        else:
+            pending.append(batch)
+
+    deadline = time.monotonic() + timeout
+    delay = 0.5
+    while pending:
+        still_pending = []
+        for batch in pending:
+            try:
+                health = {}
+                for chunk in chunk_index_names(batch.values()):
+                    health.update(target_client.cluster.health(
+                        index=",".join(chunk), level="indices", request_timeout=LIST_TIMEOUT
+                    ).get("indices", {}))
+                red = [restored for restored in batch.values()
+                       if health.get(restored, {}).get("status") == "red"]
+                failed = sorted(_failed_restore_indices(target_client, red)) if red else []
+            except exceptions.ElasticsearchException as e:
+                logger.warning("Error reading health for batch %s: %s", list(batch), e)
+                still_pending.append(batch)
+                continue
+            if failed:
+                logger.error("❌ Restore of %s failed to allocate; skipping batch %s",
+                             failed, list(batch))
+            elif all(health.get(restored, {}).get("status") in ("yellow", "green")
+                     for restored in batch.values()):
+                yield batch
+            else:
+                still_pending.append(batch)
+        pending = still_pending
+        if pending:
+            if time.monotonic() >= deadline:
+                logger.error("❌ Restore did not finish within %d s; skipping batches %s",
+                             timeout, [list(batch) for batch in pending])
+                return
+            time.sleep(delay)
+            delay = min(delay * 1.5, 30.0)
+
 # ------------------------------------------------
 # Post-Restore Validations and Alias Migration
 # ------------------------------------------------
@@ -170,17 +403,39 @@ def handle_alias_migration(source_client, target_client, original_index_name, re
     """
     try:
         # Retrieve aliases from the source index
-        src_aliases = list(
-            source_client.indices.get_alias(index=original_index_name)[original_index_name]["aliases"].keys()
-        )
+        src_aliases = retry_read(source_client.indices.get_alias, index=original_index_name)[original_index_name]["aliases"]
         if src_aliases:
             migrate_alias_between_clusters(
                 source_client,   # remove aliases from source if needed
                 target_client,   # apply aliases to the restored index on the target cluster
                 original_index_name,
                 restored_index_name,
-                src_aliases
+                src_aliases.keys()
             )
             logger.info("✅ Alias migration complete for index '%s'", original_index_name)
     except exceptions.ElasticsearchException as e:
         logger.error("Error migrating aliases for index '%s': %s", original_index_name, e)
+
+def handle_alias_migrations(source_client, target_client, index_map):
+    """
+    Batch form of handle_alias_migration: read the aliases of every original
+    index with one Get Alias call per URL-sized chunk of names, then cut them
+    all over with one bulk update_aliases per cluster. Indices missing from the
+    source are ignored rather than failing the whole batch.
+
+    :param index_map: Dict of original index name -> restored index name.
+    """
+    try:
+        src_aliases = {}
+        for chunk in chunk_index_names(index_map):
+            src_aliases.update(retry_read(source_client.indices.get_alias,
+                index=",".join(chunk), ignore_unavailable=True
+            ))
+        index_aliases = {
+            original: (restored, src_aliases.get(original, {}).get("aliases", {}).keys())
+            for original, restored in index_map.items()
+        }
+        migrate_aliases_between_clusters(source_client, target_client, index_aliases)
+        logger.info("✅ Alias migration complete for indices %s", list(index_map))
+    except exceptions.ElasticsearchException as e:
+        logger.error("Error migrating aliases for indices %s: %s", list(index_map), e)
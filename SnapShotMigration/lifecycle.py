@@ -1,15 +1,21 @@
 # lifecycle.py
 from elasticsearch import exceptions
-from config import es_source, es_target, logger
+from config import es_source, es_target, WRITE_TIMEOUT, retry_read, logger
+from cluster_migrations import parallel_put  # Shared executor bounded by POOL_MAXSIZE
 
 def migrate_ilm_policies():
     """
     Migrate Index Lifecycle Management (ILM) policies from source to target.
+    Policies are independent, idempotent writes, so they are put concurrently
+    on the shared PUT executor.
     """
+    def put_policy(item):
+        name, body = item
+        es_target.ilm.put_lifecycle(name=name, policy=body["policy"], request_timeout=WRITE_TIMEOUT)
+        logger.info("🕒 Migrated ILM policy '%s'", name)
+
     try:
-        policies = es_source.ilm.get_lifecycle()
-        for name, body in policies.items():
-            es_target.ilm.put_lifecycle(name=name, policy=body["policy"])
-            logger.info("🕒 Migrated ILM policy '%s'", name)
+        policies = retry_read(es_source.ilm.get_lifecycle)
+        parallel_put(policies.items(), put_policy, "ILM policy")
     except Exception as e:
         logger.error("Error migrating ILM policies: %s", e)
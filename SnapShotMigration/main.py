@@ -1,7 +1,8 @@
 # main.py
 import argparse
 import re
-from config import es_source, es_target, REPO_NAME, SNAPSHOT_NAME, logger
+from concurrent.futures import ThreadPoolExecutor
+from config import es_source, es_target, REPO_NAME, SNAPSHOT_NAME, RESTORE_BATCH_COUNT, logger
 from cluster_migrations import (
     migrate_component_templates,
     migrate_index_templates,
@@ -22,15 +23,18 @@ from indices import (
     list_specific_index,
     trigger_snapshot,
     check_snapshot_status,
+    get_index_sizes,
     restore_snapshot,
+    wait_for_restored_batches,
     post_restore_validations,
-    handle_alias_migration
+    handle_alias_migrations
 )
 
 # Optional renaming values.
 # For example, if you want to add a prefix "new_" to each index upon restore, define these:
 RENAME_PATTERN = "^(.*)$"     # Capture the whole index name
 RENAME_REPLACEMENT = "new_\\1"  # Prepend "new_" to each index name
+_RENAME_RE = re.compile(RENAME_PATTERN)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -63,19 +67,35 @@ def main():
         return
 
     # 2) Run all cluster‑level migrations.
-    # These functions handle migration of global configuration items that snapshots do not cover:
-    migrate_component_templates()
-    migrate_index_templates()
-    migrate_ingest_pipelines()
-    migrate_stored_scripts()
-    migrate_ilm_policies()
-    migrate_roles()
-    migrate_users()
-    migrate_role_mappings()
-    migrate_transforms()
-    migrate_rollup_jobs()
-    migrate_watchers()
-    migrate_enrich_policies()
+    # These functions handle migration of global configuration items that snapshots do not cover.
+    # Migrations within a phase touch independent resources and run concurrently;
+    # phases run in order. Each function logs and swallows its own errors, so one
+    # failure doesn't cancel the others.
+    cluster_phases = [
+        # Index templates may be composed of component templates
+        [migrate_component_templates],
+        # Templates, pipelines, scripts and policies, plus the roles users refer to
+        [
+            migrate_index_templates,
+            migrate_ingest_pipelines,
+            migrate_stored_scripts,
+            migrate_ilm_policies,
+            migrate_enrich_policies,
+            migrate_roles,
+        ],
+        # Users and role mappings reference roles; transforms, rollups and
+        # watchers may use the pipelines, templates and scripts above
+        [
+            migrate_users,
+            migrate_role_mappings,
+            migrate_transforms,
+            migrate_rollup_jobs,
+            migrate_watchers,
+        ],
+    ]
+    for phase in cluster_phases:
+        with ThreadPoolExecutor(max_workers=min(6, len(phase))) as executor:
+            list(executor.map(lambda task: task(), phase))
 
     # 3) Perform the snapshot/restore for the selected indices.
     logger.info("Triggering snapshot of indices: %s", indices)
@@ -88,33 +108,57 @@ def main():
     status = check_snapshot_status(es_source, REPO_NAME, SNAPSHOT_NAME)
     logger.info("Snapshot status: %s", status)
 
-    # Restore the snapshot on the target cluster.
-    # Here, we restore all indices from the snapshot.
-    logger.info("Restoring snapshot '%s' on target cluster", SNAPSHOT_NAME)
-    restore_resp = restore_snapshot(
-        es_target,
-        REPO_NAME,
-        SNAPSHOT_NAME,
-        indices_pattern="_all",
-        rename_pattern=RENAME_PATTERN,
-        rename_replacement=RENAME_REPLACEMENT
-    )
-    if not restore_resp:
+    # Restore the snapshot on the target cluster in size-ordered batches.
+    # The largest indices start restoring first; each batch is validated as soon
+    # as it is ready, while the remaining batches keep restoring in the background.
+    sizes = get_index_sizes(es_source)
+    ordered = sorted(indices, key=lambda idx: sizes.get(idx, 0), reverse=True)
+    batch_len = -(-len(ordered) // RESTORE_BATCH_COUNT)  # ceil division
+    batches = []
+    for start in range(0, len(ordered), batch_len):
+        batch = ordered[start:start + batch_len]
+        logger.info("Restoring %s from snapshot '%s' on target cluster", batch, SNAPSHOT_NAME)
+        restore_resp = restore_snapshot(
+            es_target,
+            REPO_NAME,
+            SNAPSHOT_NAME,
+            indices_pattern=",".join(batch),
+            rename_pattern=RENAME_PATTERN,
+            rename_replacement=RENAME_REPLACEMENT,
+            wait_for_completion=False
+        )
+        if not restore_resp:
+            logger.error("Snapshot restore failed for %s. Skipping these indices.", batch)
+            continue
+        # Determine the new index names based on the rename rule.
+        batches.append({idx: _RENAME_RE.sub(RENAME_REPLACEMENT, idx) for idx in batch})
+
+    if not batches:
         logger.error("Snapshot restore failed. Aborting migration.")
         return
 
     # 4) Post-restore: Validate each index and adjust aliases if necessary.
-    for original_index in indices:
-        # Determine the new index name based on the rename rule.
-        new_index = re.sub(RENAME_PATTERN, RENAME_REPLACEMENT, original_index)
-        logger.info("Validating migration for '%s' (restored as '%s')", original_index, new_index)
-        if not post_restore_validations(es_source, es_target, original_index, new_index):
-            logger.error("Validation failed for index '%s'.", original_index)
-        else:
-            logger.info("Index '%s' passed validations.", original_index)
+    for batch in wait_for_restored_batches(es_target, batches):
+        for original_index, new_index in batch.items():
+            logger.info("Validating migration for '%s' (restored as '%s')", original_index, new_index)
+        # Each validation is a pair of independent HTTP calls, so run them concurrently.
+        with ThreadPoolExecutor(max_workers=min(16, len(batch))) as executor:
+            results = list(executor.map(
+                lambda item: post_restore_validations(es_source, es_target, *item),
+                batch.items()
+            ))
+        for original_index, passed in zip(batch, results):
+            if not passed:
+                logger.error("Validation failed for index '%s'.", original_index)
+            else:
+                logger.info("Index '%s' passed validations.", original_index)
 
-        # Handle alias migration (this will adjust aliases if the index name has changed).
-        handle_alias_migration(es_source, es_target, original_index, new_index)
+        # Handle alias migration for renamed indices, with one bulk alias update per
+        # cluster for the whole batch. Indices restored under their original name
+        # already carry their aliases from the snapshot, so they need no cutover.
+        renamed = {idx: new_idx for idx, new_idx in batch.items() if new_idx != idx}
+        if renamed:
+            handle_alias_migrations(es_source, es_target, renamed)
 
     logger.info("🎉 Migration completed successfully")
 
@@ -6,37 +6,96 @@ from config import logger
 #alias metadata!!!
 
 
+# Keep comma-joined index names well under Elasticsearch's 4KB request-line limit
+MAX_NAMES_CHARS = 3000
+
+def chunk_index_names(names, max_chars=MAX_NAMES_CHARS):
+    """
+    Split index names into lists whose comma-joined form stays within
+    max_chars, so each list fits in a request URL.
+    """
+    chunk, length = [], 0
+    for name in names:
+        if chunk and length + len(name) + 1 > max_chars:
+            yield chunk
+            chunk, length = [], 0
+        chunk.append(name)
+        length += len(name) + 1
+    if chunk:
+        yield chunk
+
 def migrate_alias_between_clusters(
     source_client, target_client,
     old_index, new_index, aliases
 ):
     """
-    1) Remove each alias from old_index on the source cluster.
+    1) Remove the aliases from old_index on the source cluster (one atomic update).
     2) Add each alias to new_index on the target cluster.
 
     :param source_client: Elasticsearch client for the source environment.
     :param target_client: Elasticsearch client for the target environment.
     :param old_index: Name of the source index.
     :param new_index: Name of the target index.
-    :param aliases: List of alias names to migrate.
+    :param aliases: Iterable of alias names to migrate (e.g. a dict keys view).
     """
+    migrate_aliases_between_clusters(
+        source_client, target_client, {old_index: (new_index, aliases)}
+    )
+
+def migrate_aliases_between_clusters(source_client, target_client, index_aliases):
+    """
+    Batch form of migrate_alias_between_clusters covering many indices at once:
+    a single update_aliases call removes every alias on the source cluster and
+    a single update_aliases call adds them all on the target cluster.
+
+    :param source_client: Elasticsearch client for the source environment.
+    :param target_client: Elasticsearch client for the target environment.
+    :param index_aliases: Dict of old_index -> (new_index, iterable of alias names).
+    """
+    # Build both action lists in one pass, so aliases may be any iterable
+    # (e.g. a dict keys view or generator) rather than a materialized list.
+    remove_actions = []
+    add_actions = []
+    for old_index, (new_index, aliases) in index_aliases.items():
+        for alias in aliases:
+            remove_actions.append({"remove": {"index": old_index, "alias": alias}})
+            add_actions.append({"add": {"index": new_index, "alias": alias}})
+    if not add_actions:
+        return
+
     # 1) Remove on source cluster
-    for alias in aliases:
+    try:
         try:
-            source_client.indices.delete_alias(index=old_index, name=alias)
-            logger.info("🔗 Removed alias '%s' from '%s' on SOURCE", alias, old_index)
+            source_client.indices.update_aliases(body={"actions": remove_actions})
         except exceptions.NotFoundError:
-            # Alias wasn’t there—ignore
-            pass
-        except Exception as e:
-            logger.error("❗ Error removing alias '%s' from '%s' on SOURCE: %s",
-                         alias, old_index, e)
+            # Some alias wasn’t there—retry with only the ones that still exist
+            # Look up only the indices that had aliases, in URL-sized chunks
+            existing = {}
+            for chunk in chunk_index_names({a["remove"]["index"] for a in remove_actions}):
+                existing.update(source_client.indices.get_alias(
+                    index=",".join(chunk), ignore_unavailable=True
+                ))
+            remove_actions = [
+                a for a in remove_actions
+                if a["remove"]["alias"] in existing.get(a["remove"]["index"], {}).get("aliases", {})
+            ]
+            if remove_actions:
+                source_client.indices.update_aliases(body={"actions": remove_actions})
+        for old_index in index_aliases:
+            removed = [a["remove"]["alias"] for a in remove_actions if a["remove"]["index"] == old_index]
+            if removed:
+                logger.info("🔗 Removed aliases %s from '%s' on SOURCE", removed, old_index)
+    except Exception as e:
+        logger.error("❗ Error removing aliases from %s on SOURCE: %s",
+                     list(index_aliases), e)
 
     # 2) Add on target cluster
-    actions = [{"add": {"index": new_index, "alias": alias}} for alias in aliases]
     try:
-        target_client.indices.update_aliases(body={"actions": actions})
-        logger.info("🔗 Added aliases %s to '%s' on TARGET", aliases, new_index)
+        target_client.indices.update_aliases(body={"actions": add_actions})
+        for new_index, _ in index_aliases.values():
+            added = [a["add"]["alias"] for a in add_actions if a["add"]["index"] == new_index]
+            if added:
+                logger.info("🔗 Added aliases %s to '%s' on TARGET", added, new_index)
     except Exception as e:
-        logger.error("❗ Error adding aliases %s to '%s' on TARGET: %s",
-                     aliases, new_index, e)
+        logger.error("❗ Error adding aliases to %s on TARGET: %s",
+                     [new_index for new_index, _ in index_aliases.values()], e)
@@ -1,49 +1,142 @@
 # indices.py
 
 import fnmatch
+import functools
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from elasticsearch import exceptions
 from config import (
     es_source,        # Elasticsearch client for the source cluster
     es_target,        # Elasticsearch client for the target cluster
     PREFIX,           # Prefix to apply to migrated index names
-    SLICE_COUNT,      # Number of slices for parallel reindexing
+    SLICE_COUNT,      # Number of slices for parallel reindexing (0 = "auto")
     BATCH_SIZE,       # Number of documents per batch in reindex
+    REINDEX_BATCH_BYTES,  # Target bytes per reindex batch
     REQUEST_TIMEOUT,  # Timeout for long‐running requests
     THROTTLE_DOCS_PER_SEC,  # Throttle speed for reindex
+    LIST_TIMEOUT,     # Timeout for cheap listing/exists lookups
+    INDEX_CACHE_TTL,  # Seconds to reuse a cat.indices listing
+    POLL_INITIAL_DELAY,  # First delay between reindex task polls
+    POLL_MAX_DELAY,   # Cap on the delay between reindex task polls
+    TASK_WAIT_SECONDS,  # Server-side wait per blocking tasks.get
+    MAX_CONCURRENT_REINDEX,  # Reindex tasks allowed to run at once
+    STALL_POLLS,      # Polls without progress before warning about a stalled reindex
+    retry_read,       # Retry wrapper for idempotent reads
     logger            # Central logger
 )
 from alias_utils import migrate_alias_between_clusters  # Cross‐cluster alias helper
 from validation_utils import compare_doc_counts, compare_mappings
 
+# Cached cat.indices listings, keyed by id(client) -> (fetched_at, names)
+_index_cache = {}
+
+def _cat_index_names(source_client, index=None, state="open", match=None):
+    """
+    Return the non‑system index names reported by the Cat Indices API.
+    Only the index column is requested, as plain text with one name per line.
+
+    :param index: Optional index expression to filter on server-side.
+    :param state: Which indices wildcards expand to ("open", "closed" or "all").
+    :param match: Optional predicate (e.g. a compiled regex's search) applied in the same pass.
+    """
+    resp = retry_read(source_client.cat.indices,
+        index=index, h="index", format="text", expand_wildcards=state,
+        request_timeout=LIST_TIMEOUT
+    )
+    names = (line.strip() for line in str(resp).splitlines())
+    # Filter out blank lines and names starting with '.'
+    return [
+        name for name in names
+        if name and not name.startswith(".") and (match is None or match(name))
+    ]
+
+def _log_closed_indices(source_client, index=None):
+    """
+    Log the closed indices skipped by the listing helpers. Closed indices can't be
+    migrated until they are opened, so they are reported rather than returned.
+    """
+    try:
+        closed = _cat_index_names(source_client, index=index, state="closed")
+        if closed:
+            logger.info("Skipping closed indices: %s", closed)
+    except exceptions.ElasticsearchException as e:
+        logger.warning("Could not list closed indices: %s", e)
+
+def _fetch_all_indices(source_client):
+    """
+    Return a tuple of all open non‑system index names on the given cluster.
+
+    The Cat Indices response is cached per client for INDEX_CACHE_TTL seconds,
+    so repeated lookups during discovery cost a single round trip.
+    """
+    key = id(source_client)
+    now = time.monotonic()
+    cached = _index_cache.get(key)
+    if cached and now - cached[0] < INDEX_CACHE_TTL:
+        return cached[1]
+    names = tuple(_cat_index_names(source_client))
+    _log_closed_indices(source_client)
+    _index_cache[key] = (now, names)
+    return names
+
+# Regex metacharacters that end a literal prefix
+_REGEX_META = ".^$*+?{}[]()|\\"
+# Characters that can't appear in an index name (or would change a wildcard expression)
+_NON_INDEX_CHARS = ' ,"<>/#'
+
+def _literal_prefix(regex_pattern):
+    """
+    Return the literal prefix of an anchored regex (e.g. '^logs-.*' -> 'logs-'),
+    or None when the pattern can't be safely narrowed to a wildcard.
+    """
+    if not regex_pattern.startswith("^") or "|" in regex_pattern:
+        return None
+    prefix = []
+    for ch in regex_pattern[1:]:
+        if ch in _REGEX_META:
+            # A quantifier after the last literal makes it optional
+            if ch in "?*{" and prefix:
+                prefix.pop()
+            break
+        if ch in _NON_INDEX_CHARS:
+            return None
+        prefix.append(ch)
+    return "".join(prefix) or None
+
+@functools.lru_cache(maxsize=256)
+def _compile_regex(regex_pattern):
+    """Compile a user-supplied index regex once, however often it is listed."""
+    return re.compile(regex_pattern)
+
 def list_indices(source_client):
     """
-    Return all non‑system indices (open + closed) from the given source cluster.
+    Return all open non‑system indices from the given source cluster.
 
     Uses the Cat Indices API to list indices, then filters out any name
     beginning with a dot ('.') to avoid system indices.
     """
     try:
-        raw = source_client.cat.indices(format="json", expand_wildcards="all")
-        # Each entry has a field "index"; filter out names starting with '.'
-        return [idx["index"] for idx in raw if not idx["index"].startswith(".")]
+        return list(_fetch_all_indices(source_client))
     except exceptions.ElasticsearchException as e:
         logger.error("Error listing indices: %s", e)
         return []
 
 def list_indices_by_regex(source_client, regex_pattern):
     """
-    Retrieve all non‑system indices that match the given regex pattern.
+    Retrieve all open non‑system indices that match the given regex pattern.
 
-    1. List all non‑system indices.
+    1. List non‑system indices, letting the server pre-filter by the
+       regex's literal prefix when the pattern is anchored (e.g. '^logs-').
     2. Compile the provided regex and filter the list.
     """
     try:
-        raw = source_client.cat.indices(format="json", expand_wildcards="all")
-        indices = [idx["index"] for idx in raw if not idx["index"].startswith(".")]
-        compiled = re.compile(regex_pattern)
-        return [idx for idx in indices if compiled.search(idx)]
+        search = _compile_regex(regex_pattern).search
+        prefix = _literal_prefix(regex_pattern)
+        if prefix:
+            _log_closed_indices(source_client, index=f"{prefix}*")
+            return _cat_index_names(source_client, index=f"{prefix}*", match=search)
+        return [idx for idx in _fetch_all_indices(source_client) if search(idx)]
     except exceptions.ElasticsearchException as e:
         logger.error("Error listing indices by regex '%s': %s", regex_pattern, e)
         return []
@@ -52,20 +145,51 @@ def list_specific_index(source_client, index_name):
     """
     Retrieve a specific index by exact match.
 
-    Lists non‑system indices and returns a list containing index_name if it exists.
+    Issues a single Get Settings request for just index.uuid and returns a list
+    containing index_name if it is a concrete index. Aliases and data streams
+    resolve to other (backing) index names, so they don't count as a match.
     """
+    # System indices and wildcard expressions never count as an exact match
+    if index_name.startswith(".") or any(c in index_name for c in "*,"):
+        return []
     try:
-        raw = source_client.cat.indices(format="json", expand_wildcards="all")
-        indices = [idx["index"] for idx in raw if not idx["index"].startswith(".")]
-        return [idx for idx in indices if idx == index_name]
+        resp = retry_read(source_client.indices.get_settings,
+            index=index_name, name="index.uuid", ignore_unavailable=True,
+            request_timeout=LIST_TIMEOUT
+        )
+        return [index_name] if index_name in resp else []
     except exceptions.ElasticsearchException as e:
         logger.error("Error listing specific index '%s': %s", index_name, e)
         return []
 
 
+def fetch_templates(source_client):
+    """
+    Fetch the source cluster's index templates once, for reuse across every
+    index being migrated.
 
+    Returns a list of (compiled, name, template) tuples, where compiled is a
+    single regex alternation of the template's fnmatch index patterns and
+    template is the template's settings/mappings/aliases body.
+    Returns None (so callers fetch per index) if the templates can't be read.
+    """
+    try:
+        templates = retry_read(source_client.indices.get_index_template).get("index_templates", [])
+    except exceptions.ElasticsearchException as e:
+        logger.error("Error fetching index templates: %s", e)
+        return None
+    return [
+        (
+            re.compile("|".join(
+                f"(?:{fnmatch.translate(pat)})" for pat in tpl["index_template"]["index_patterns"]
+            )),
+            tpl["name"],
+            tpl["index_template"]["template"]
+        )
+        for tpl in templates
+    ]
 
-def create_index_if_no_template(source_client, target_client, index_name, new_index_name):
+def create_index_if_no_template(source_client, target_client, index_name, new_index_name, templates=None):
     """
     Ensure new_index_name exists on target with the same settings/mappings/aliases
     as index_name on source—either via an index template or by copying directly.
@@ -73,18 +197,20 @@ def create_index_if_no_template(source_client, target_client, index_name, new_in
     Steps:
     1) Try to find a matching index template on the source cluster.
        - If found, extract its settings/mappings/aliases and create the index on target.
-    2) If no template matches, fetch the source index's settings & mappings
-       via the Get Settings and Get Mapping APIs and create the target index.
-    3) Copy any existing aliases from source → target via the Put Alias API.
+    2) If no template matches, fetch the source index's settings, mappings & aliases
+       with a single Get Index call and create the target index.
+    3) Copy any existing aliases from source → target with one Update Aliases call.
+
+    :param templates: Templates pre-fetched with fetch_templates; if None they
+                      are fetched from the source cluster for this call.
     """
     try:
         # Step 1: Look for a matching index template
-        templates = source_client.indices.get_index_template().get("index_templates", [])
-        for tpl in templates:
-            patterns = tpl["index_template"]["index_patterns"]
-            if any(fnmatch.fnmatch(index_name, pat) for pat in patterns):
-                logger.info("🧩 Using template '%s' for index '%s'", tpl["name"], index_name)
-                tmpl = tpl["index_template"]["template"]
+        if templates is None:
+            templates = fetch_templates(source_client) or []
+        for compiled, name, tmpl in templates:
+            if compiled.match(index_name):
+                logger.info("🧩 Using template '%s' for index '%s'", name, index_name)
                 # Filter out internal metadata keys
                 settings = {
                     k: v for k, v in tmpl["settings"].get("index", {}).items()
@@ -101,41 +227,84 @@ def create_index_if_no_template(source_client, target_client, index_name, new_in
 
         # Step 2: No template → copy settings & mappings directly
         logger.info("⚙️  No template for '%s'; copying settings/mappings manually", index_name)
-        # Get source index settings
-        src_settings = source_client.indices.get_settings(index=index_name)[index_name]["settings"]["index"]
+        # Get source index settings, mappings and aliases in one Get Index call
+        info = retry_read(source_client.indices.get, index=index_name)[index_name]
+        src_settings = info["settings"]["index"]
         settings = {
             k: v for k, v in src_settings.items()
             if not k.startswith(("version", "uuid", "provided_name"))
         }
-        # Get source index mappings
-        mappings = source_client.indices.get_mapping(index=index_name)[index_name]["mappings"]
+        mappings = info["mappings"]
         body = {"settings": settings, "mappings": mappings}
         # Create the index on the target cluster
         target_client.indices.create(index=new_index_name, body=body)
 
         # Step 3: Copy aliases
-        aliases = source_client.indices.get(index=index_name)[index_name].get("aliases", {})
-        for alias in aliases:
-            target_client.indices.put_alias(index=new_index_name, name=alias)
+        aliases = info.get("aliases", {})
+        actions = [{"add": {"index": new_index_name, "alias": alias}} for alias in aliases]
+        if actions:
+            target_client.indices.update_aliases(body={"actions": actions})
         logger.info("✅ Created '%s' with aliases %s", new_index_name, list(aliases))
 
     except exceptions.ElasticsearchException as e:
         logger.error("Error creating index '%s': %s", new_index_name, e)
 
-def migrate_index(source_client, target_client, index_name):
+class _ProgressTracker:
+    """
+    Remember each reindex task's processed-doc count across polls and warn once
+    a task has made no progress for STALL_POLLS consecutive polls.
     """
-    Migrate data for a specific index from the source to the target cluster.
 
-    1) Ensure the target index exists with proper settings/mappings.
-    2) Kick off a remote, sliced reindex to copy documents.
-    3) Poll the Tasks API until reindex completes.
-    4) Log any failures or successes.
-    5) Migrate aliases from the source cluster to the target cluster.
+    def __init__(self):
+        self._last = {}  # task_id -> (docs processed, polls without progress)
+
+    def update(self, task_id, stats):
+        """Record a poll of task_id; return True if it progressed since the last one."""
+        done = stats.get("created", 0) + stats.get("updated", 0) + stats.get("deleted", 0)
+        last_done, idle = self._last.get(task_id, (-1, 0))
+        if done != last_done:
+            self._last[task_id] = (done, 0)
+            return True
+        idle += 1
+        self._last[task_id] = (done, idle)
+        if idle == STALL_POLLS:
+            logger.warning("⚠️  Reindex task %s has made no progress for %d polls (%d docs)",
+                           task_id, idle, done)
+        return False
+
+    def forget(self, task_id):
+        self._last.pop(task_id, None)
+
+def _reindex_batch_size(source_client, index_name):
+    """
+    Size reindex scroll batches by bytes rather than document count.
+
+    Remote reindex buffers each batch on-heap (capped at 100MB), so large
+    documents can overflow a BATCH_SIZE-doc batch. Use the index's average
+    primary document size to keep a batch near REINDEX_BATCH_BYTES, never
+    exceeding BATCH_SIZE docs.
+    """
+    try:
+        stats = retry_read(source_client.indices.stats,
+            index=index_name, metric="docs,store"
+        )["indices"][index_name]["primaries"]
+    except (exceptions.ElasticsearchException, KeyError) as e:
+        logger.warning("Could not read stats for '%s'; using batch size %d: %s",
+                       index_name, BATCH_SIZE, e)
+        return BATCH_SIZE
+    avg_doc_bytes = stats["store"]["size_in_bytes"] / max(stats["docs"]["count"], 1)
+    return max(1, min(BATCH_SIZE, int(REINDEX_BATCH_BYTES / max(avg_doc_bytes, 1))))
+
+def _start_reindex(source_client, target_client, index_name, templates=None):
+    """
+    Create the target index and kick off a remote, sliced reindex as a background task.
+
+    :return: (task_id, new_index) on success, None if the reindex could not be started.
     """
     new_index = f"{PREFIX}{index_name}"
 
     # 1) Create target index if it doesn't already exist
-    create_index_if_no_template(source_client, target_client, index_name, new_index)
+    create_index_if_no_template(source_client, target_client, index_name, new_index, templates)
 
     # 2) Prepare the reindex body
     body = {
@@ -147,15 +316,14 @@ def migrate_index(source_client, target_client, index_name):
                 "password": source_client.transport.hosts[0].get("pass", "pass")
             },
             "index": index_name,
-            "size":  BATCH_SIZE
+            "size":  _reindex_batch_size(source_client, index_name)
         },
         "dest": {"index": new_index},
-        "slices": SLICE_COUNT,                   # Parallelize the reindex into N slices
+        "slices": SLICE_COUNT if SLICE_COUNT else "auto",  # Parallelize the reindex into N slices
         "requests_per_second": THROTTLE_DOCS_PER_SEC  # Throttle speed if needed
     }
 
     try:
-        # 2) Kick off the reindex as a background task
         resp = target_client.reindex(
             body=body,
             wait_for_completion=False,
@@ -163,18 +331,73 @@ def migrate_index(source_client, target_client, index_name):
         )
         task_id = resp["task"]
         logger.info("🚀 Started reindex task %s for %s → %s", task_id, index_name, new_index)
+        return task_id, new_index
+    except exceptions.TransportError as e:
+        logger.error("TransportError during reindex of '%s': %s", index_name, e.info)
+    except Exception as e:
+        logger.error("Unexpected error during reindex of '%s': %s", index_name, e)
+    return None
 
-        # 3) Poll the Tasks API for completion
-        while True:
-            status = target_client.tasks.get(task_id=task_id)
-            if status.get("completed"):
-                break
-            stats = status["task"]["status"]
-            logger.info("   Progress: %d/%d docs", stats.get("created", 0), stats.get("total", 0))
-            time.sleep(30)
+def _wait_for_task(target_client, task_id):
+    """
+    Wait for task_id to complete using the Tasks API's server-side long poll.
 
+    Each tasks.get blocks on the cluster for up to TASK_WAIT_SECONDS and returns
+    as soon as the task finishes, so there is no client-side sleep. When the
+    server-side wait times out, the current progress is read and logged instead.
+    If the blocking form is rejected or fails for any other reason, fall back to
+    polling with backoff.
+    """
+    tracker = _ProgressTracker()
+    long_poll = True
+    delay = POLL_INITIAL_DELAY
+    while True:
+        status = None
+        if long_poll:
+            try:
+                status = target_client.tasks.get(
+                    task_id=task_id,
+                    wait_for_completion=True,
+                    timeout=f"{TASK_WAIT_SECONDS}s",
+                    # Let the HTTP client wait slightly longer than Elasticsearch
+                    request_timeout=TASK_WAIT_SECONDS + 5
+                )
+            except exceptions.RequestError as e:
+                logger.info("Blocking tasks.get not supported (%s); polling task %s instead",
+                            e.error, task_id)
+                long_poll = False
+            except exceptions.ConnectionTimeout:
+                # HTTP client gave up first; the task is still running
+                pass
+            except exceptions.TransportError as e:
+                # The server-side wait expiring is reported as a timeout_exception
+                # (HTTP 500 or 429 depending on the version), not as a 408
+                if e.error != "timeout_exception":
+                    # A real error: stop long polling so retries are spaced out
+                    # by the backoff below
+                    logger.warning("Blocking tasks.get for task %s failed (%s); polling instead",
+                                   task_id, e.error)
+                    long_poll = False
+        if status is None:
+            status = retry_read(target_client.tasks.get, task_id=task_id)
+        if status.get("completed"):
+            return status
+        stats = status["task"]["status"]
+        logger.info("   Progress: %d/%d docs", stats.get("created", 0), stats.get("total", 0))
+        tracker.update(task_id, stats)
+        if not long_poll:
+            time.sleep(delay)
+            delay = min(delay * 1.5, POLL_MAX_DELAY)
+
+def _finish_migration(source_client, target_client, index_name, new_index, status):
+    """
+    Report the outcome of a completed reindex task, validate the target index
+    and migrate aliases from the source cluster to the target cluster.
+    """
+    try:
         # 4) Check for failures in the reindex response
-        failures = status["task"]["status"].get("failures", [])
+        stats = status["task"]["status"]
+        failures = stats.get("failures", [])
         if failures:
             logger.warning("❗ Reindex of '%s' completed with %d failures", index_name, len(failures))
         else:
@@ -191,18 +414,14 @@ def migrate_index(source_client, target_client, index_name):
             return
 
         # 5) Migrate aliases cross‑cluster, if any exist
-        src_aliases = list(
-            source_client.indices
-                .get_alias(index=index_name)[index_name]["aliases"]
-                .keys()
-        )
+        src_aliases = retry_read(source_client.indices.get_alias, index=index_name)[index_name]["aliases"]
         if src_aliases:
             migrate_alias_between_clusters(
                 source_client,   # remove aliases here
                 target_client,   # add aliases here
                 index_name,      # old index name
                 new_index,       # new index name
-                src_aliases      # list of alias names
+                src_aliases.keys()  # alias names
             )
 
     except exceptions.TransportError as e:
@@ -210,6 +429,98 @@ def migrate_index(source_client, target_client, index_name):
     except Exception as e:
         logger.error("Unexpected error during reindex of '%s': %s", index_name, e)
 
+def migrate_index(source_client, target_client, index_name, templates=None):
+    """
+    Migrate data for a specific index from the source to the target cluster.
+
+    1) Ensure the target index exists with proper settings/mappings.
+    2) Kick off a remote, sliced reindex to copy documents.
+    3) Wait on the Tasks API (server-side long poll) until reindex completes.
+    4) Log any failures or successes.
+    5) Migrate aliases from the source cluster to the target cluster.
+    """
+    started = _start_reindex(source_client, target_client, index_name, templates)
+    if not started:
+        return
+    task_id, new_index = started
+
+    try:
+        # 3) Wait on the Tasks API for completion
+        status = _wait_for_task(target_client, task_id)
+    except exceptions.TransportError as e:
+        logger.error("TransportError during reindex of '%s': %s", index_name, e.info)
+        return
+    except Exception as e:
+        logger.error("Unexpected error during reindex of '%s': %s", index_name, e)
+        return
+
+    _finish_migration(source_client, target_client, index_name, new_index, status)
+
+def migrate_indices(source_client, target_client, index_names, templates=None):
+    """
+    Migrate several indices with up to MAX_CONCURRENT_REINDEX reindex tasks
+    running side by side.
+
+    Each poll issues a single Tasks API listing for every running reindex
+    instead of one tasks.get per index. A task that drops out of the listing
+    has completed: its final status is fetched once, validation and alias
+    migration are handed to a worker thread, and the next index's reindex is
+    started in its place.
+    """
+    remaining = iter(index_names)
+    # task_id ("node:id") -> (index_name, new_index)
+    pending = {}
+
+    def start_next():
+        # Top up the running reindex tasks to the concurrency cap
+        while len(pending) < MAX_CONCURRENT_REINDEX:
+            index_name = next(remaining, None)
+            if index_name is None:
+                return
+            started = _start_reindex(source_client, target_client, index_name, templates)
+            if started:
+                task_id, new_index = started
+                pending[task_id] = (index_name, new_index)
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REINDEX) as finisher:
+        start_next()
+        tracker = _ProgressTracker()
+        delay = POLL_INITIAL_DELAY
+        while pending:
+            time.sleep(delay)
+            # Back off while the set of running tasks is unchanged; poll quickly
+            # again once a task has completed and another one was started.
+            delay = min(delay * 1.5, POLL_MAX_DELAY)
+            try:
+                listing = target_client.tasks.list(actions="*reindex", detailed=True)
+            except exceptions.TransportError as e:
+                logger.error("TransportError listing reindex tasks: %s", e.info)
+                continue
+
+            running = {}
+            for node_id, node in listing.get("nodes", {}).items():
+                for tid, task in node.get("tasks", {}).items():
+                    running[tid] = task
+
+            for task_id in list(pending):
+                index_name, new_index = pending[task_id]
+                if task_id in running:
+                    stats = running[task_id].get("status", {})
+                    logger.info("   Progress of '%s': %d/%d docs",
+                                index_name, stats.get("created", 0), stats.get("total", 0))
+                    tracker.update(task_id, stats)
+                    continue
+                del pending[task_id]
+                tracker.forget(task_id)
+                delay = POLL_INITIAL_DELAY
+                try:
+                    status = _wait_for_task(target_client, task_id)
+                except exceptions.TransportError as e:
+                    logger.error("TransportError during reindex of '%s': %s", index_name, e.info)
+                    continue
+                finisher.submit(_finish_migration, source_client, target_client,
+                                index_name, new_index, status)
+            start_next()
 
 
 
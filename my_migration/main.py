@@ -1,5 +1,6 @@
 # main.py
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from config import es_source, es_target, logger
 from cluster_migrations import (
     migrate_component_templates,
@@ -19,7 +20,8 @@ from indices import (
     list_indices,
     list_indices_by_regex,
     list_specific_index,
-    migrate_index
+    fetch_templates,
+    migrate_indices
 )
 
 #To run for a specific index:
@@ -65,23 +67,39 @@ def main():
         logger.info("No matching indices found. Exiting.")
         return
 
-    # 2) Run all cluster‑level migrations (no client ambiguity here):
-    migrate_component_templates()
-    migrate_index_templates()
-    migrate_ingest_pipelines()
-    migrate_stored_scripts()
-    migrate_ilm_policies()
-    migrate_roles()
-    migrate_users()
-    migrate_role_mappings()
-    migrate_transforms()
-    migrate_rollup_jobs()
-    migrate_watchers()
-    migrate_enrich_policies()
+    # 2) Run all cluster‑level migrations (no client ambiguity here).
+    # Migrations within a phase touch independent resources and run concurrently;
+    # phases run in order. Each function logs and swallows its own errors.
+    cluster_phases = [
+        # Index templates may be composed of component templates
+        [migrate_component_templates],
+        # Templates, pipelines, scripts and policies, plus the roles users refer to
+        [
+            migrate_index_templates,
+            migrate_ingest_pipelines,
+            migrate_stored_scripts,
+            migrate_ilm_policies,
+            migrate_enrich_policies,
+            migrate_roles,
+        ],
+        # Users and role mappings reference roles; transforms, rollups and
+        # watchers may use the pipelines, templates and scripts above
+        [
+            migrate_users,
+            migrate_role_mappings,
+            migrate_transforms,
+            migrate_rollup_jobs,
+            migrate_watchers,
+        ],
+    ]
+    for phase in cluster_phases:
+        with ThreadPoolExecutor(max_workers=min(6, len(phase))) as executor:
+            list(executor.map(lambda task: task(), phase))
 
-    # 3) Migrate each index (explicitly passing both clients)
-    for idx in indices:
-        migrate_index(es_source, es_target, idx)
+    # 3) Migrate the indices (explicitly passing both clients).
+    # Index templates are fetched once and shared by every index.
+    templates = fetch_templates(es_source)
+    migrate_indices(es_source, es_target, indices, templates)
 
     logger.info("🎉 Migration completed successfully")
 
@@ -1,18 +1,38 @@
 # validation_utils.py
 
+import functools
+import json
 import logging
+import time
 from elasticsearch import exceptions
+from config import retry_read
 
 logger = logging.getLogger("validation_utils")
 
+@functools.lru_cache(maxsize=16)
+def _get_version(client):
+    """Return the cluster's version number, fetched once per client."""
+    return retry_read(client.info)['version']['number']
+
+def _get_mapping(client, index):
+    """Return an index's mappings."""
+    return retry_read(client.indices.get_mapping, index=index)[index]['mappings']
+
+def _canonical_mapping(client, index):
+    """
+    Return the index's mapping serialized canonically (sorted keys, no
+    whitespace), so equal mappings compare as two flat strings.
+    """
+    return json.dumps(_get_mapping(client, index), sort_keys=True, separators=(',', ':'))
+
 def check_version_compatibility(source_client, target_client):
     """
     Ensure source and target Elasticsearch clusters are running the same major.minor version.
     Returns True if compatible, False otherwise.
     """
     try:
-        src_version = source_client.info()['version']['number']
-        tgt_version = target_client.info()['version']['number']
+        src_version = _get_version(source_client)
+        tgt_version = _get_version(target_client)
         src_mm = '.'.join(src_version.split('.')[:2])
         tgt_mm = '.'.join(tgt_version.split('.')[:2])
         if src_mm != tgt_mm:
@@ -34,8 +54,8 @@ def compare_doc_counts(source_client, target_client, source_index, target_index)
     target_index on target_client. Returns True if they match.
     """
     try:
-        src_count = source_client.count(index=source_index)['count']
-        tgt_count = target_client.count(index=target_index)['count']
+        src_count = retry_read(source_client.count, index=source_index)['count']
+        tgt_count = retry_read(target_client.count, index=target_index)['count']
         if src_count != tgt_count:
             logger.error(
                 "Doc count mismatch for '%s': source=%d, target=%d",
@@ -60,12 +80,11 @@ def compare_mappings(source_client, target_client, source_index, target_index):
     Returns True if they are identical.
     """
     try:
-        src_map = source_client.indices.get_mapping(index=source_index)[source_index]['mappings']
-        tgt_map = target_client.indices.get_mapping(index=target_index)[target_index]['mappings']
-        if src_map != tgt_map:
+        if _canonical_mapping(source_client, source_index) != _canonical_mapping(target_client, target_index):
             logger.error("Mapping mismatch for '%s' vs '%s'", source_index, target_index)
             # For debugging, you can uncomment these:
-            # import json
+            # src_map = _get_mapping(source_client, source_index)
+            # tgt_map = _get_mapping(target_client, target_index)
             # logger.debug("Source mapping: %s", json.dumps(src_map, indent=2, sort_keys=True))
             # logger.debug("Target mapping: %s", json.dumps(tgt_map, indent=2, sort_keys=True))
             return False
@@ -78,9 +97,13 @@ def compare_mappings(source_client, target_client, source_index, target_index):
         )
         return False
 
-def create_snapshot(client, repository, snapshot_name, indices=None, wait_for_completion=True):
+def create_snapshot(client, repository, snapshot_name, indices=None, wait_for_completion=False):
     """
     Create a snapshot of the given indices (or all if None) in the specified repository.
+
+    The create request returns as soon as the snapshot has started. With
+    wait_for_completion=True, wait_for_snapshot is then used to poll until it
+    finishes, instead of holding the HTTP request open for the whole snapshot.
     """
     try:
         body = {'indices': indices} if indices else {}
@@ -88,20 +111,46 @@ def create_snapshot(client, repository, snapshot_name, indices=None, wait_for_co
             repository=repository,
             snapshot=snapshot_name,
             body=body,
-            wait_for_completion=wait_for_completion
+            wait_for_completion=False
         )
-        logger.info("Snapshot '%s' created in repository '%s'", snapshot_name, repository)
-        return True
+        logger.info("Snapshot '%s' started in repository '%s'", snapshot_name, repository)
     except exceptions.ElasticsearchException as e:
         logger.error("Error creating snapshot '%s': %s", snapshot_name, e)
         return False
+    if wait_for_completion:
+        return wait_for_snapshot(client, repository, snapshot_name)
+    return True
+
+def wait_for_snapshot(client, repository, snapshot_name, initial_delay=0.5, max_delay=30.0):
+    """
+    Poll the snapshot's state until it finishes, backing off exponentially from
+    initial_delay up to max_delay seconds between polls.
+    Returns True if the snapshot completed successfully, False otherwise.
+    """
+    delay = initial_delay
+    try:
+        while True:
+            # Get Snapshot is much cheaper than the per-shard Snapshot Status API
+            resp = retry_read(client.snapshot.get, repository=repository, snapshot=snapshot_name)
+            state = resp['snapshots'][0]['state']
+            if state == 'SUCCESS':
+                logger.info("Snapshot '%s' created in repository '%s'", snapshot_name, repository)
+                return True
+            if state != 'IN_PROGRESS':
+                logger.error("Snapshot '%s' finished in state %s", snapshot_name, state)
+                return False
+            time.sleep(delay)
+            delay = min(delay * 1.5, max_delay)
+    except exceptions.ElasticsearchException as e:
+        logger.error("Error waiting for snapshot '%s': %s", snapshot_name, e)
+        return False
 
 def list_snapshots(client, repository):
     """
     List all snapshots in the given repository.
     """
     try:
-        resp = client.snapshot.get(repository=repository, snapshot='_all')
+        resp = retry_read(client.snapshot.get, repository=repository, snapshot='_all')
         snapshots = [s['snapshot'] for s in resp.get('snapshots', [])]
         logger.info("Snapshots in '%s': %s", repository, snapshots)
         return snapshots